@@ -1,12 +1,25 @@
 #!/usr/bin/env python3
 """Check for different XML structures across .sts.xml files"""
 
-import xml.etree.ElementTree as ET
+import os
+from itertools import islice
 from pathlib import Path
 from collections import defaultdict
 
+try:
+    from lxml import etree as ET
+
+    def local_name(element):
+        """Tag name without namespace (computed in C by lxml)"""
+        return ET.QName(element).localname
+except ImportError:
+    import xml.etree.ElementTree as ET
+
+    def local_name(element):
+        """Tag name without namespace"""
+        return element.tag.split('}')[-1] if '}' in element.tag else element.tag
+
 base_dir = Path('/projects/codon_0000/data/RapunzlSequel2e/')
-sts_files = list(base_dir.rglob("*.sts.xml"))
 
 # Filter out barcode files
 def is_main_file(filepath):
@@ -20,15 +33,29 @@ def is_main_file(filepath):
         return False
     return True
 
-sts_files = [f for f in sts_files if is_main_file(f)]
+def iter_main_sts(path):
+    """Lazily yield main .sts.xml files below path, so the walk stops once enough are found"""
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    yield from iter_main_sts(entry.path)
+                elif entry.name.endswith('.sts.xml'):
+                    sts_file = Path(entry.path)
+                    if is_main_file(sts_file):
+                        yield sts_file
+    except (PermissionError, FileNotFoundError, NotADirectoryError):
+        pass
+
+sts_files = list(islice(iter_main_sts(base_dir), 20))  # Check first 20 files
 
-print(f"Analyzing {len(sts_files)} main .sts.xml files...")
+print(f"Analyzing first {len(sts_files)} main .sts.xml files...")
 print()
 
 # Group files by XML structure
 structures = defaultdict(list)
 
-for sts_file in sts_files[:20]:  # Check first 20 files
+for sts_file in sts_files:
     try:
         tree = ET.parse(sts_file)
         root = tree.getroot()
@@ -37,15 +64,18 @@ for sts_file in sts_files[:20]:  # Check first 20 files
         version = root.get('Version', 'unknown')
         
         # Get root tag (without namespace)
-        root_tag = root.tag.split('}')[-1] if '}' in root.tag else root.tag
+        root_tag = local_name(root)
         
-        # Check for key elements
+        # Check for key elements, comparing against namespace-qualified
+        # tags so child tags don't need splitting
+        ns = root.tag.split('}', 1)[0] + '}' if '}' in root.tag else ''
+        qnames = {ns + name: name for name in ('NumSequencingZmws', 'MovieLength', 'SequencingUmy')}
         has_num_zmws = False
         has_movie_length = False
         has_sequencing_umy = False
         
         for child in root:
-            tag = child.tag.split('}')[-1] if '}' in child.tag else child.tag
+            tag = qnames.get(child.tag)
             if tag == 'NumSequencingZmws':
                 has_num_zmws = True
             elif tag == 'MovieLength':
@@ -77,7 +107,7 @@ for structure, files in structures.items():
         for i, child in enumerate(root):
             if i >= 10:
                 break
-            tag = child.tag.split('}')[-1] if '}' in child.tag else child.tag
+            tag = local_name(child)
             text = child.text[:50] if child.text and len(child.text) > 50 else child.text
             print(f"    {tag}: {text}")
     except:
@@ -1,10 +1,22 @@
 #!/usr/bin/env python3
 """Inspect XML structure of .sts.xml file"""
 
-import xml.etree.ElementTree as ET
 from pathlib import Path
 from collections import Counter
 
+try:
+    from lxml import etree as ET
+
+    def local_name(element):
+        """Tag name without namespace (computed in C by lxml)"""
+        return ET.QName(element).localname
+except ImportError:
+    import xml.etree.ElementTree as ET
+
+    def local_name(element):
+        """Tag name without namespace"""
+        return element.tag.split('}')[-1] if '}' in element.tag else element.tag
+
 sts_file = Path('/projects/codon_0000/data/RapunzlSequel2e/r64241e_20240314_114036/3_C01/m64241e_240316_184724.sts.xml')
 
 if not sts_file.exists():
@@ -15,26 +27,32 @@ print(f"Analyzing: {sts_file.name}")
 print(f"Size: {sts_file.stat().st_size} bytes")
 print()
 
-tree = ET.parse(sts_file)
-root = tree.getroot()
+# Collect all tags in one iterparse pass, tracking the element path on a stack
+all_tags = []
+# Namespace-free name per qualified tag, computed once per distinct tag
+local_names = {}
+path_stack = []
+root = None
+for event, element in ET.iterparse(str(sts_file), events=('start', 'end')):
+    if event == 'end':
+        path_stack.pop()
+        continue
+    if root is None:
+        root = element
+    tag = local_names.get(element.tag)
+    if tag is None:
+        tag = local_name(element)
+        local_names[element.tag] = tag
+    current_path = f"{path_stack[-1]}/{tag}" if path_stack else tag
+    path_stack.append(current_path)
+    all_tags.append((current_path, tag))
 
 print(f"Root tag: {root.tag}")
 print(f"Root attributes: {root.attrib}")
 print()
 
-# Collect all tags
-all_tags = []
-def collect_tags(element, path=""):
-    tag = element.tag.split('}')[-1] if '}' in element.tag else element.tag
-    current_path = f"{path}/{tag}" if path else tag
-    all_tags.append((current_path, tag))
-    for child in element:
-        collect_tags(child, current_path)
-
-collect_tags(root)
-
 # Count unique tags
-tag_counter = Counter([t[1] for t in all_tags])
+tag_counter = Counter(tag for _, tag in all_tags)
 
 print("All unique tags in file:")
 for tag, count in sorted(tag_counter.items()):
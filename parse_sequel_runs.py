@@ -6,12 +6,219 @@ Handles both CCS/HiFi (ConsensusReadSet) and CLR (SubreadSet) runs
 Filters out barcode-specific files to provide run-wide metrics only
 """
 
-import xml.etree.ElementTree as ET
+from collections import Counter, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+import csv
+from functools import lru_cache, partial
+from itertools import chain, groupby, islice
+import json
+import os
+import re
+import sqlite3
 from pathlib import Path
-import pandas as pd
-from datetime import datetime
+from datetime import datetime, timezone
 import argparse
 
+# lxml's libxml2-backed parser is much faster than the stdlib one; fall back
+# to xml.etree when it is not installed (same parse/find/findall API)
+try:
+    from lxml import etree as ET
+    HAVE_LXML = True
+except ImportError:
+    import xml.etree.ElementTree as ET
+    HAVE_LXML = False
+
+
+def _scandir_recursive(path, prune=None):
+    """Yield every DirEntry below path, without following directory symlinks
+    
+    Directories whose name satisfies prune(name) are yielded but not entered.
+    Unreadable or missing directories (including a missing base directory, as
+    rglob treated it) yield nothing.
+    """
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                yield entry
+                if entry.is_dir(follow_symlinks=False) and not (prune and prune(entry.name)):
+                    yield from _scandir_recursive(entry.path, prune)
+    except (PermissionError, FileNotFoundError, NotADirectoryError):
+        pass
+
+
+# Default location of the parsed-file cache (see ParseCache)
+DEFAULT_CACHE_FILE = '.sequel_runs_cache.sqlite'
+
+# Bump whenever the parse methods change what they return, so stale cache
+# entries are discarded
+CACHE_VERSION = 1
+
+# Every column the parse methods can produce, in output order; keep in sync
+# with _parse_readset and parse_sts_file. Seeds the --streaming CSV header
+OUTPUT_COLUMNS = (
+    # ConsensusReadSet / SubreadSet
+    'xml_file', 'run_path', 'run_id', 'bam_file', 'is_hifi_bam', 'total_length', 'num_records',
+    'instrument_id', 'instrument_name', 'context', 'created_at', 'run_name', 'sample_name',
+    'well_name', 'insert_size', 'loading_concentration', 'application', 'movie_length_min',
+    'target_insert_size', 'binding_kit', 'binding_kit_part', 'cell_type', 'run_type',
+    # .sts.xml
+    'sts_file', 'num_sequencing_zmws', 'actual_movie_length_min', 'total_bases', 'yield_gb',
+    'p0_empty', 'p1_single', 'p2_multi', 'p0_percent', 'p1_percent', 'p2_percent',
+    'productive_zmws', 'productivity_percent', 'mean_read_length', 'median_read_length',
+    'n50_read_length', 'snr_a', 'snr_c', 'snr_g', 'snr_t',
+)
+
+# Rows buffered before the --streaming CSV header is fixed
+STREAMING_HEADER_WINDOW = 32
+
+# Barcode patterns in a file name (e.g. .bc2011--bc2011. or
+# .bc1001_BAK8A_OA--bc1001_BAK8A_OA.) and "unbarcoded" subsets, matched in one pass
+_BC_RE = re.compile(r'(?:^|\.)bc[^.]*--bc|unbarcoded', re.IGNORECASE)
+
+
+def is_main_file(filename):
+    """Check if file is a main run file (not barcode-specific)
+    
+    Barcode directories are pruned during the walk; this catches barcode
+    patterns in the names of files outside them.
+    """
+    return _BC_RE.search(filename) is None
+
+
+def is_barcode_dir(name):
+    """Barcode subset directories (e.g. bc2011--bc2011/, unbarcoded/) hold no run-wide files"""
+    return (name.startswith('bc') and '--bc' in name) or name == 'unbarcoded'
+
+
+def _elementpath_findall(node, path, namespaces):
+    """Stdlib stand-in for a compiled lxml XPath"""
+    return node.findall(path, namespaces)
+
+
+def compile_xpath(path, namespaces):
+    """Compile an XPath once; calling the result on a node returns a list of matches"""
+    if HAVE_LXML:
+        return ET.XPath(path, namespaces=namespaces)
+    return partial(_elementpath_findall, path=path, namespaces=namespaces)
+
+
+@lru_cache(maxsize=None)
+def local_name(tag):
+    """Tag without its '{namespace}' prefix; memoised, so each distinct tag is split once"""
+    return tag.rpartition('}')[2]
+
+
+def _elementpath_findtext(node, path, namespaces):
+    """Stdlib stand-in for a compiled lxml string() XPath"""
+    return node.findtext(path, '', namespaces)
+
+
+def compile_text_xpath(path, namespaces):
+    """Compile an XPath once; calling the result on a node returns the text of
+    the first match as a plain str, or '' when nothing matches"""
+    if HAVE_LXML:
+        return ET.XPath(f'string({path})', namespaces=namespaces, smart_strings=False)
+    return partial(_elementpath_findtext, path=path, namespaces=namespaces)
+
+
+def _int_xp(xp, node):
+    """Integer value of a compiled text XPath, or None when missing or empty"""
+    s = xp(node)
+    return int(s) if s else None
+
+
+def _float_xp(xp, node):
+    """Float value of a compiled text XPath, or None when missing or empty"""
+    s = xp(node)
+    return float(s) if s else None
+
+
+# Fractional seconds shorter than 6 digits, padded for pre-3.11 fromisoformat
+_ISO_FRACTION_RE = re.compile(r'\.(\d{1,5})(?=[+-]|$)')
+
+
+def parse_created_at(value):
+    """Parse a PacBio CreatedAt timestamp (ISO 8601) to a UTC datetime, or None"""
+    if not value:
+        return None
+    # Before Python 3.11 fromisoformat rejects a trailing 'Z' and fractions
+    # that are not 3 or 6 digits long (PacBio writes e.g. '10:55:07.6+00:00')
+    if value.endswith('Z'):
+        value = value[:-1] + '+00:00'
+    value = _ISO_FRACTION_RE.sub(lambda m: '.' + m.group(1).ljust(6, '0'), value)
+    try:
+        created_at = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return created_at.astimezone(timezone.utc)
+
+
+def created_at_key(row):
+    """Sort key for runs by creation date; undated runs sort below dated ones"""
+    created_at = row.get('created_at')
+    return (created_at is not None, created_at)
+
+
+def first(nodes):
+    """First match of a compiled XPath, or None"""
+    return nodes[0] if nodes else None
+
+
+class ParseCache:
+    """SQLite sidecar caching parse results keyed on (path, mtime, size)
+    
+    Run XML files are write-once, so a file whose mtime and size are unchanged
+    parses to the same dict and can be skipped on the next invocation.
+    """
+    
+    def __init__(self, db_path):
+        self.conn = sqlite3.connect(str(db_path))
+        try:
+            # Bulk-insert friendly; losing the cache only costs a re-parse
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.execute('PRAGMA synchronous=OFF')
+            if self.conn.execute('PRAGMA user_version').fetchone()[0] != CACHE_VERSION:
+                self.conn.execute('DROP TABLE IF EXISTS cache')
+                self.conn.execute(f'PRAGMA user_version = {CACHE_VERSION}')
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS cache (path TEXT PRIMARY KEY, mtime REAL, size INTEGER, json BLOB)')
+        except sqlite3.Error:
+            self.conn.close()
+            raise
+    
+    @staticmethod
+    def key(xml_path):
+        """Cache key for a file: (path as given, mtime, size)"""
+        st = os.stat(xml_path)
+        return str(xml_path), st.st_mtime, st.st_size
+    
+    def get(self, key):
+        """Cached data for key, or None on a miss"""
+        row = self.conn.execute(
+            'SELECT json FROM cache WHERE path = ? AND mtime = ? AND size = ?', key).fetchone()
+        if row is None:
+            return None
+        data = json.loads(row[0])
+        if data.get('created_at'):
+            data['created_at'] = parse_created_at(data['created_at'])
+        return data
+    
+    def put(self, key, data):
+        """Store the parse result for key"""
+        self.conn.execute(
+            'INSERT OR REPLACE INTO cache (path, mtime, size, json) VALUES (?, ?, ?, ?)',
+            key + (json.dumps(data, default=datetime.isoformat),))
+    
+    def commit(self):
+        self.conn.commit()
+    
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+
 class SequelRunParser:
     """Parse PacBio Sequel IIe run statistics"""
     
@@ -20,55 +227,103 @@ class SequelRunParser:
         'pbds': 'http://pacificbiosciences.com/PacBioDatasets.xsd',
         'pbbase': 'http://pacificbiosciences.com/PacBioBaseDataModel.xsd',
         'pbmeta': 'http://pacificbiosciences.com/PacBioCollectionMetadata.xsd',
-        'ns': 'http://pacificbiosciences.com/PacBioBaseDataModel.xsd'
+        'ns': 'http://pacificbiosciences.com/PacBioBaseDataModel.xsd',
+        'pbsts': 'http://pacificbiosciences.com/PacBioPipelineStats.xsd'
     }
     
-    def __init__(self, base_dir):
+    # lxml parser settings, used for both parse() and iterparse()
+    _LXML_OPTIONS = {'huge_tree': False, 'remove_blank_text': True,
+                     'collect_ids': False, 'resolve_entities': False}
+    
+    # One parser instance per process, shared by every parse call so tag names
+    # and namespaces are interned once (lxml only). It lives on the class, so
+    # each worker process builds its own on import and the parser itself is
+    # never pickled with the instance
+    _parser = ET.XMLParser(**_LXML_OPTIONS) if HAVE_LXML else None
+    
+    # Compiled ConsensusReadSet/SubreadSet lookups, shared by both parsers
+    _XP_CONSENSUS_BAM = compile_xpath(
+        './/pbbase:ExternalResource[@MetaType="PacBio.ConsensusReadFile.ConsensusReadBamFile"]', NAMESPACES)
+    _XP_DATASET_METADATA = compile_xpath('./pbds:DataSetMetadata', NAMESPACES)
+    _XP_COLLECTION_METADATA = compile_xpath('.//pbmeta:CollectionMetadata', NAMESPACES)
+    _XP_RUN_DETAILS = compile_xpath('.//pbmeta:RunDetails', NAMESPACES)
+    _XP_WELL_SAMPLE = compile_xpath('.//pbmeta:WellSample', NAMESPACES)
+    _XP_AUTOMATION = compile_xpath('.//pbmeta:Automation', NAMESPACES)
+    _XP_AUTOMATION_PARAMETER = compile_xpath('.//pbbase:AutomationParameter', NAMESPACES)
+    _XP_BINDING_KIT = compile_xpath('.//pbmeta:BindingKit', NAMESPACES)
+    _XP_CELL_PAC = compile_xpath('.//pbmeta:CellPac', NAMESPACES)
+    
+    # Scalar fields read straight as text, without building an element for each
+    _XP_TOTAL_LENGTH_TEXT = compile_text_xpath('./pbds:TotalLength', NAMESPACES)
+    _XP_NUM_RECORDS_TEXT = compile_text_xpath('./pbds:NumRecords', NAMESPACES)
+    _XP_RUN_NAME_TEXT = compile_text_xpath('./pbmeta:Name', NAMESPACES)
+    _XP_WELL_NAME_TEXT = compile_text_xpath('./pbmeta:WellName', NAMESPACES)
+    _XP_INSERT_SIZE_TEXT = compile_text_xpath('./pbmeta:InsertSize', NAMESPACES)
+    _XP_LOADING_CONCENTRATION_TEXT = compile_text_xpath('./pbmeta:OnPlateLoadingConcentration', NAMESPACES)
+    _XP_APPLICATION_TEXT = compile_text_xpath('./pbmeta:Application', NAMESPACES)
+    
+    # .sts.xml statistics we read - top-level PipeStats children. They are
+    # matched by local name in any namespace, as schema versions differ
+    _STS_WANTED = frozenset(['NumSequencingZmws', 'MovieLength', 'SequencingUmy',
+                             'LoadingDist', 'ProdDist', 'ReadLenDist', 'HqRegionSnrDist'])
+    
+    # lxml-only iterparse options; tag= filters events down to the wanted
+    # statistics in C (stdlib iterparse takes none of these and reports every element)
+    _STS_ITERPARSE_OPTIONS = (dict(_LXML_OPTIONS, tag=['{*}' + name for name in sorted(_STS_WANTED)])
+                              if HAVE_LXML else {})
+    
+    def __init__(self, base_dir, jobs=1, cache=None):
         self.base_dir = Path(base_dir)
+        self.jobs = jobs
+        self.cache = cache
+    
+    def __getstate__(self):
+        # Worker processes only parse; the cache connection stays in this process
+        state = self.__dict__.copy()
+        state['cache'] = None
+        return state
         
     def find_xml_files(self):
         """Find all relevant XML files in directory structure, excluding barcode-specific files"""
-        # Find all XML files recursively
-        all_consensus_files = list(self.base_dir.rglob("*.consensusreadset.xml"))
-        all_subread_files = list(self.base_dir.rglob("*.subreadset.xml"))
-        all_sts_files = list(self.base_dir.rglob("*.sts.xml"))
-        
-        # Filter out barcode-specific files
-        # Barcode files are typically in subdirectories named like "bc2011--bc2011"
-        # or have barcode patterns in their filenames
-        def is_main_file(filepath):
-            """Check if file is a main run file (not barcode-specific)"""
-            path_str = str(filepath)
-            filename = filepath.name
-            
-            # Skip if in a barcode subdirectory (e.g., bc2011--bc2011/)
-            if '/bc' in path_str and '--bc' in path_str:
-                return False
+        # Walk the tree once, sorting files by suffix as we go. Barcode
+        # subdirectories (e.g. bc2011--bc2011/) are pruned so their files are
+        # never listed; barcode-specific file names are filtered out
+        consensus_files, subread_files, sts_files = [], [], []
+        totals = {'consensus': 0, 'subread': 0, 'sts': 0}
+        for entry in _scandir_recursive(self.base_dir, prune=is_barcode_dir):
+            filename = entry.name
+            if filename.endswith('.sts.xml'):
+                kind, matches = 'sts', sts_files
+            elif filename.endswith('.consensusreadset.xml'):
+                kind, matches = 'consensus', consensus_files
+            elif filename.endswith('.subreadset.xml'):
+                kind, matches = 'subread', subread_files
+            else:
+                continue
             
-            # Skip if filename contains barcode pattern (e.g., .bc2011--bc2011.)
-            if '.bc' in filename and '--bc' in filename:
-                return False
-            
-            # Skip "unbarcoded" files as these are also subsets
-            if 'unbarcoded' in filename.lower():
-                return False
-                
-            return True
-        
-        consensus_files = [f for f in all_consensus_files if is_main_file(f)]
-        subread_files = [f for f in all_subread_files if is_main_file(f)]
-        sts_files = [f for f in all_sts_files if is_main_file(f)]
+            totals[kind] += 1
+            if is_main_file(filename):
+                matches.append(Path(entry.path))
         
-        print(f"Found {len(all_consensus_files)} total consensusreadset files, {len(consensus_files)} main files")
-        print(f"Found {len(all_subread_files)} total subreadset files, {len(subread_files)} main files")
-        print(f"Found {len(all_sts_files)} total sts files, {len(sts_files)} main files")
+        print(f"Found {totals['consensus']} total consensusreadset files, {len(consensus_files)} main files")
+        print(f"Found {totals['subread']} total subreadset files, {len(subread_files)} main files")
+        print(f"Found {totals['sts']} total sts files, {len(sts_files)} main files")
         
         return consensus_files, subread_files, sts_files
     
     def parse_consensusreadset(self, xml_path):
         """Extract run conditions from consensusreadset.xml (HiFi/CCS runs)"""
-        tree = ET.parse(xml_path)
+        return self._parse_readset(xml_path, 'CCS/HiFi')
+    
+    def parse_subreadset(self, xml_path):
+        """Extract run conditions from subreadset.xml (CLR runs)"""
+        return self._parse_readset(xml_path, 'CLR')
+    
+    def _parse_readset(self, xml_path, run_type):
+        """Extract run conditions shared by ConsensusReadSet and SubreadSet files"""
+        tree = ET.parse(str(xml_path), parser=self._parser)
         root = tree.getroot()
+        is_ccs = run_type == 'CCS/HiFi'
 
         data = {
             'xml_file': xml_path.name,
@@ -80,57 +335,53 @@ class SequelRunParser:
         # Check BAM file type - hifi_reads.bam vs reads.bam
         # .hifi_reads.bam = Q20+ filtered HiFi reads (correct for yield)
         # .reads.bam = all CCS reads including low-quality (inflated yield)
-        bam_resource = root.find('.//pbbase:ExternalResource[@MetaType="PacBio.ConsensusReadFile.ConsensusReadBamFile"]', self.NAMESPACES)
-        if bam_resource is not None:
-            bam_file = bam_resource.get('ResourceId', '')
-            data['bam_file'] = bam_file
-            data['is_hifi_bam'] = '.hifi_reads.bam' in bam_file
+        if is_ccs:
+            bam_resource = first(self._XP_CONSENSUS_BAM(root))
+            if bam_resource is not None:
+                bam_file = bam_resource.get('ResourceId', '')
+                data['bam_file'] = bam_file
+                data['is_hifi_bam'] = '.hifi_reads.bam' in bam_file
 
         # Basic dataset info - must be from DataSetMetadata, not ExternalResources
-        dataset_metadata = root.find('pbds:DataSetMetadata', self.NAMESPACES)
+        dataset_metadata = first(self._XP_DATASET_METADATA(root))
         if dataset_metadata is not None:
-            total_length = dataset_metadata.find('pbds:TotalLength', self.NAMESPACES)
-            num_records = dataset_metadata.find('pbds:NumRecords', self.NAMESPACES)
+            total_length = _int_xp(self._XP_TOTAL_LENGTH_TEXT, dataset_metadata)
+            num_records = _int_xp(self._XP_NUM_RECORDS_TEXT, dataset_metadata)
 
             if total_length is not None:
-                data['total_length'] = int(total_length.text)
+                data['total_length'] = total_length
             if num_records is not None:
-                data['num_records'] = int(num_records.text)
+                data['num_records'] = num_records
 
         # Collection metadata
-        collection = root.find('.//pbmeta:CollectionMetadata', self.NAMESPACES)
+        collection = first(self._XP_COLLECTION_METADATA(root))
         if collection is not None:
             data['instrument_id'] = collection.get('InstrumentId')
             data['instrument_name'] = collection.get('InstrumentName')
             data['context'] = collection.get('Context')
-            data['created_at'] = collection.get('CreatedAt')
+            data['created_at'] = parse_created_at(collection.get('CreatedAt'))
             
         # Run details
-        run_details = root.find('.//pbmeta:RunDetails', self.NAMESPACES)
+        run_details = first(self._XP_RUN_DETAILS(root))
         if run_details is not None:
-            name = run_details.find('pbmeta:Name', self.NAMESPACES)
-            data['run_name'] = name.text if name is not None else None
+            data['run_name'] = self._XP_RUN_NAME_TEXT(run_details) or None
             
         # Well sample info
-        well = root.find('.//pbmeta:WellSample', self.NAMESPACES)
+        well = first(self._XP_WELL_SAMPLE(root))
         if well is not None:
             data['sample_name'] = well.get('Name')
-            well_name = well.find('pbmeta:WellName', self.NAMESPACES)
-            data['well_name'] = well_name.text if well_name is not None else None
-            
-            insert_size = well.find('pbmeta:InsertSize', self.NAMESPACES)
-            data['insert_size'] = int(insert_size.text) if insert_size is not None else None
+            data['well_name'] = self._XP_WELL_NAME_TEXT(well) or None
+            data['insert_size'] = _int_xp(self._XP_INSERT_SIZE_TEXT, well)
+            data['loading_concentration'] = _float_xp(self._XP_LOADING_CONCENTRATION_TEXT, well)
             
-            on_plate_conc = well.find('pbmeta:OnPlateLoadingConcentration', self.NAMESPACES)
-            data['loading_concentration'] = float(on_plate_conc.text) if on_plate_conc is not None else None
-            
-            application = well.find('pbmeta:Application', self.NAMESPACES)
-            data['application'] = application.text if application is not None else None
+            # Only recorded for CCS/HiFi runs
+            if is_ccs:
+                data['application'] = self._XP_APPLICATION_TEXT(well) or None
         
         # Automation parameters (Movie length, etc.)
-        automation = root.find('.//pbmeta:Automation', self.NAMESPACES)
+        automation = first(self._XP_AUTOMATION(root))
         if automation is not None:
-            for param in automation.findall('.//pbbase:AutomationParameter', self.NAMESPACES):
+            for param in self._XP_AUTOMATION_PARAMETER(automation):
                 param_name = param.get('Name')
                 param_value = param.get('SimpleValue')
                 
@@ -140,235 +391,280 @@ class SequelRunParser:
                     data['target_insert_size'] = int(param_value)
                     
         # Kit information
-        binding_kit = root.find('.//pbmeta:BindingKit', self.NAMESPACES)
+        binding_kit = first(self._XP_BINDING_KIT(root))
         if binding_kit is not None:
             data['binding_kit'] = binding_kit.get('Name')
             data['binding_kit_part'] = binding_kit.get('PartNumber')
             
-        cell_pac = root.find('.//pbmeta:CellPac', self.NAMESPACES)
+        cell_pac = first(self._XP_CELL_PAC(root))
         if cell_pac is not None:
             data['cell_type'] = cell_pac.get('Name')
-            
+        
+        data['run_type'] = run_type
         return data
     
-    def parse_subreadset(self, xml_path):
-        """Extract run conditions from subreadset.xml (CLR runs)"""
-        tree = ET.parse(xml_path)
-        root = tree.getroot()
-
-        data = {
-            'xml_file': xml_path.name,
-            'run_path': str(xml_path.parent),
-            # Extract run ID from path
-            'run_id': xml_path.parent.parent.name if 'r64241e_' in xml_path.parent.parent.name else None
-        }
-
-        # Basic dataset info - must be from DataSetMetadata, not ExternalResources
-        dataset_metadata = root.find('pbds:DataSetMetadata', self.NAMESPACES)
-        if dataset_metadata is not None:
-            total_length = dataset_metadata.find('pbds:TotalLength', self.NAMESPACES)
-            num_records = dataset_metadata.find('pbds:NumRecords', self.NAMESPACES)
-
-            if total_length is not None:
-                data['total_length'] = int(total_length.text)
-            if num_records is not None:
-                data['num_records'] = int(num_records.text)
-
-        # Collection metadata
-        collection = root.find('.//pbmeta:CollectionMetadata', self.NAMESPACES)
-        if collection is not None:
-            data['instrument_id'] = collection.get('InstrumentId')
-            data['instrument_name'] = collection.get('InstrumentName')
-            data['context'] = collection.get('Context')
-            data['created_at'] = collection.get('CreatedAt')
-            
-        # Run details
-        run_details = root.find('.//pbmeta:RunDetails', self.NAMESPACES)
-        if run_details is not None:
-            name = run_details.find('pbmeta:Name', self.NAMESPACES)
-            data['run_name'] = name.text if name is not None else None
-            
-        # Well sample info
-        well = root.find('.//pbmeta:WellSample', self.NAMESPACES)
-        if well is not None:
-            data['sample_name'] = well.get('Name')
-            well_name = well.find('pbmeta:WellName', self.NAMESPACES)
-            data['well_name'] = well_name.text if well_name is not None else None
-            
-            insert_size = well.find('pbmeta:InsertSize', self.NAMESPACES)
-            data['insert_size'] = int(insert_size.text) if insert_size is not None else None
-            
-            on_plate_conc = well.find('pbmeta:OnPlateLoadingConcentration', self.NAMESPACES)
-            data['loading_concentration'] = float(on_plate_conc.text) if on_plate_conc is not None else None
+    @classmethod
+    def _iter_sts_stats(cls, xml_path):
+        """Yield (local name, element) for each wanted top-level statistic of an sts file
         
-        # Automation parameters
-        automation = root.find('.//pbmeta:Automation', self.NAMESPACES)
-        if automation is not None:
-            for param in automation.findall('.//pbbase:AutomationParameter', self.NAMESPACES):
-                param_name = param.get('Name')
-                param_value = param.get('SimpleValue')
-                
-                if param_name == 'MovieLength':
-                    data['movie_length_min'] = float(param_value)
-                elif param_name == 'InsertSize':
-                    data['target_insert_size'] = int(param_value)
-                    
-        # Kit information
-        binding_kit = root.find('.//pbmeta:BindingKit', self.NAMESPACES)
-        if binding_kit is not None:
-            data['binding_kit'] = binding_kit.get('Name')
-            data['binding_kit_part'] = binding_kit.get('PartNumber')
-            
-        cell_pac = root.find('.//pbmeta:CellPac', self.NAMESPACES)
-        if cell_pac is not None:
-            data['cell_type'] = cell_pac.get('Name')
-            
-        return data
+        Each element is cleared once the caller moves on, along with the
+        top-level elements before it, to keep memory flat.
+        """
+        if HAVE_LXML:
+            # The tag filter only lets the wanted statistics through
+            for _, elem in ET.iterparse(str(xml_path), events=('end',), **cls._STS_ITERPARSE_OPTIONS):
+                yield local_name(elem.tag), elem
+                elem.clear()
+                while elem.getprevious() is not None:
+                    del elem.getparent()[0]
+            return
+        
+        # Stdlib reports every element; depth picks out the root's children,
+        # whose nested values must survive until they close
+        depth = 0
+        for event, elem in ET.iterparse(str(xml_path), events=('start', 'end')):
+            if event == 'start':
+                depth += 1
+                continue
+            depth -= 1
+            if depth == 1:
+                name = local_name(elem.tag)
+                if name in cls._STS_WANTED:
+                    yield name, elem
+                elem.clear()
     
     def parse_sts_file(self, xml_path):
-        """Extract statistics from .sts.xml file"""
-        tree = ET.parse(xml_path)
-        root = tree.getroot()
+        """Extract statistics from .sts.xml file
         
+        Streams the file in one pass, reading each statistic as its element
+        closes and clearing top-level elements afterwards to keep memory flat.
+        """
         data = {
             'sts_file': xml_path.name,
         }
         
-        # Helper function to find elements ignoring namespace
-        def find_element(parent, tag_name):
-            """Find element by tag name, ignoring namespace"""
-            for elem in parent:
-                # Get tag without namespace
-                local_tag = elem.tag.split('}')[-1] if '}' in elem.tag else elem.tag
-                if local_tag == tag_name:
-                    return elem
-            return None
+        # Raw text captured during the pass, converted once it is complete
+        values = {}
+        bin_counts = {}
+        read_len = {}
+        snr_by_channel = {}
         
-        def find_all_elements(parent, tag_name):
-            """Find all elements by tag name, ignoring namespace"""
-            results = []
-            for elem in parent.iter():
-                local_tag = elem.tag.split('}')[-1] if '}' in elem.tag else elem.tag
-                if local_tag == tag_name:
-                    results.append(elem)
-            return results
+        for name, elem in self._iter_sts_stats(xml_path):
+            if name in ('NumSequencingZmws', 'MovieLength', 'SequencingUmy'):
+                values.setdefault(name, elem.text)
+            elif name in ('LoadingDist', 'ProdDist'):
+                if name not in bin_counts:
+                    bin_counts[name] = [b.text for b in elem.iterfind('.//{*}BinCount')]
+            elif name == 'ReadLenDist':
+                if not read_len:
+                    for key, path in (('mean', '{*}SampleMean'),
+                                      ('median', '{*}SampleMed'),
+                                      ('n50', '{*}SampleN50')):
+                        read_len[key] = elem.findtext(path) or None
+            elif name == 'HqRegionSnrDist':
+                # SNR values - one HqRegionSnrDist per Channel attribute
+                snr_by_channel.setdefault(elem.get('Channel'), elem.findtext('{*}SampleMean') or None)
         
         # Basic stats - these are direct children of root
-        num_zmws = find_element(root, 'NumSequencingZmws')
-        data['num_sequencing_zmws'] = int(num_zmws.text) if num_zmws is not None else None
+        num_zmws = values.get('NumSequencingZmws')
+        data['num_sequencing_zmws'] = int(num_zmws) if num_zmws is not None else None
         
-        movie_length = find_element(root, 'MovieLength')
-        data['actual_movie_length_min'] = int(movie_length.text) if movie_length is not None else None
+        movie_length = values.get('MovieLength')
+        data['actual_movie_length_min'] = int(movie_length) if movie_length is not None else None
         
-        sequencing_umy = find_element(root, 'SequencingUmy')
-        data['total_bases'] = int(sequencing_umy.text) if sequencing_umy is not None else None
+        sequencing_umy = values.get('SequencingUmy')
+        data['total_bases'] = int(sequencing_umy) if sequencing_umy is not None else None
         data['yield_gb'] = round(data['total_bases'] / 1e9, 2) if data['total_bases'] else None
         
         # P0, P1, P2 from LoadingDist
-        loading_dist = find_element(root, 'LoadingDist')
-        if loading_dist is not None:
-            bin_counts = find_all_elements(loading_dist, 'BinCount')
+        loading_bins = bin_counts.get('LoadingDist')
+        if loading_bins is not None and len(loading_bins) >= 3:
+            data['p0_empty'] = int(loading_bins[0])
+            data['p1_single'] = int(loading_bins[1])
+            data['p2_multi'] = int(loading_bins[2])
             
-            if len(bin_counts) >= 3:
-                data['p0_empty'] = int(bin_counts[0].text)
-                data['p1_single'] = int(bin_counts[1].text)
-                data['p2_multi'] = int(bin_counts[2].text)
-                
-                if data['num_sequencing_zmws']:
-                    data['p0_percent'] = round(100 * data['p0_empty'] / data['num_sequencing_zmws'], 2)
-                    data['p1_percent'] = round(100 * data['p1_single'] / data['num_sequencing_zmws'], 2)
-                    data['p2_percent'] = round(100 * data['p2_multi'] / data['num_sequencing_zmws'], 2)
+            if data['num_sequencing_zmws']:
+                data['p0_percent'] = round(100 * data['p0_empty'] / data['num_sequencing_zmws'], 2)
+                data['p1_percent'] = round(100 * data['p1_single'] / data['num_sequencing_zmws'], 2)
+                data['p2_percent'] = round(100 * data['p2_multi'] / data['num_sequencing_zmws'], 2)
         
         # Productivity
-        prod_dist = find_element(root, 'ProdDist')
-        if prod_dist is not None:
-            bin_counts = find_all_elements(prod_dist, 'BinCount')
-            if len(bin_counts) >= 2:
-                data['productive_zmws'] = int(bin_counts[1].text)  # Index 1 is "Productive"
-                if data['num_sequencing_zmws']:
-                    data['productivity_percent'] = round(100 * data['productive_zmws'] / data['num_sequencing_zmws'], 2)
+        prod_bins = bin_counts.get('ProdDist')
+        if prod_bins is not None and len(prod_bins) >= 2:
+            data['productive_zmws'] = int(prod_bins[1])  # Index 1 is "Productive"
+            if data['num_sequencing_zmws']:
+                data['productivity_percent'] = round(100 * data['productive_zmws'] / data['num_sequencing_zmws'], 2)
         
         # Read length statistics
-        read_len_dist = find_element(root, 'ReadLenDist')
-        if read_len_dist is not None:
-            mean_elem = find_element(read_len_dist, 'SampleMean')
-            median_elem = find_element(read_len_dist, 'SampleMed')
-            n50_elem = find_element(read_len_dist, 'SampleN50')
-            
-            data['mean_read_length'] = int(float(mean_elem.text)) if mean_elem is not None else None
-            data['median_read_length'] = int(float(median_elem.text)) if median_elem is not None else None
-            data['n50_read_length'] = int(float(n50_elem.text)) if n50_elem is not None else None
+        if read_len:
+            data['mean_read_length'] = int(float(read_len['mean'])) if read_len['mean'] is not None else None
+            data['median_read_length'] = int(float(read_len['median'])) if read_len['median'] is not None else None
+            data['n50_read_length'] = int(float(read_len['n50'])) if read_len['n50'] is not None else None
         
-        # SNR values - need to find HqRegionSnrDist elements with Channel attribute
         for channel in ['A', 'C', 'G', 'T']:
-            # Find all HqRegionSnrDist elements
-            snr_dists = find_all_elements(root, 'HqRegionSnrDist')
-            for snr_dist in snr_dists:
-                if snr_dist.get('Channel') == channel:
-                    mean_elem = find_element(snr_dist, 'SampleMean')
-                    if mean_elem is not None:
-                        data[f'snr_{channel.lower()}'] = round(float(mean_elem.text), 2)
-                    break
+            mean_text = snr_by_channel.get(channel)
+            if mean_text is not None:
+                data[f'snr_{channel.lower()}'] = round(float(mean_text), 2)
         
         return data
     
+    def _try_parse(self, parse, xml_path):
+        """Run one parse method, returning (data, None) or (None, error message)"""
+        try:
+            return parse(xml_path), None
+        except Exception as e:
+            return None, str(e)
+    
+    def _parse_files(self, parse, xml_files, executor=None):
+        """Yield (xml_path, data) for each file that parses with parse()"""
+        return self._parse_tasks([(parse, xml_file) for xml_file in xml_files], executor)
+    
+    def _parse_tasks(self, tasks, executor=None):
+        """Yield (xml_path, data) for each (parse, xml_path) task that parses, reporting failures
+        
+        Results already in the cache are reused; the remaining tasks are spread
+        over the executor's worker processes when one is given, at most a few
+        chunks ahead of the task being yielded. Results always come back in
+        task order.
+        """
+        window = 16 * self.jobs if executor is not None else 0
+        pending = deque()
+        try:
+            for parse, xml_path in tasks:
+                pending.append(self._start_task(parse, xml_path, executor))
+                while len(pending) > window:
+                    yield from self._finish_task(*pending.popleft())
+            while pending:
+                yield from self._finish_task(*pending.popleft())
+        finally:
+            for _, _, outcome, _ in pending:
+                if isinstance(outcome, Future):
+                    outcome.cancel()
+            if self.cache is not None:
+                self.cache.commit()
+    
+    def _start_task(self, parse, xml_path, executor):
+        """Look a task up in the cache, or start parsing it; returns (xml_path, key, outcome, fresh)"""
+        key = None
+        if self.cache is not None:
+            try:
+                key = self.cache.key(xml_path)
+            except OSError as e:
+                return xml_path, None, (None, e), False
+            data = self.cache.get(key)
+            if data is not None:
+                return xml_path, key, (data, None), False
+        
+        if executor is not None:
+            return xml_path, key, executor.submit(self._try_parse, parse, xml_path), True
+        return xml_path, key, self._try_parse(parse, xml_path), True
+    
+    def _finish_task(self, xml_path, key, outcome, fresh):
+        """Yield the result of a task started by _start_task, reporting a failure instead"""
+        data, error = outcome.result() if isinstance(outcome, Future) else outcome
+        if error is not None:
+            print(f"Error parsing {xml_path}: {error}")
+            return
+        if fresh and key is not None:
+            self.cache.put(key, data)
+        yield xml_path, data
+    
     def parse_all_runs(self):
-        """Parse all runs and combine data"""
+        """Parse all runs and combine data into one dict per SMRT Cell"""
         consensus_files, subread_files, sts_files = self.find_xml_files()
         
-        all_data = []
-        
         # Create mapping of run contexts to files
         run_data = {}
         
-        # Parse ConsensusReadSet files (HiFi/CCS runs)
-        for consensus_file in consensus_files:
-            try:
-                data = self.parse_consensusreadset(consensus_file)
-                data['run_type'] = 'CCS/HiFi'
-                context = data.get('context', consensus_file.stem)
-                
-                if context not in run_data:
-                    run_data[context] = {}
-                run_data[context].update(data)
-                
-            except Exception as e:
-                print(f"Error parsing {consensus_file}: {e}")
+        # Each file parses independently, so only parsing is spread over
+        # worker processes; merging stays in this process
+        executor = ProcessPoolExecutor(max_workers=self.jobs) if self.jobs > 1 else None
+        try:
+            # Parse ConsensusReadSet (HiFi/CCS) and SubreadSet (CLR) files
+            for parse, readset_files in ((self.parse_consensusreadset, consensus_files),
+                                         (self.parse_subreadset, subread_files)):
+                for readset_file, data in self._parse_files(parse, readset_files, executor):
+                    context = data.get('context', readset_file.stem)
+                    run_data.setdefault(context, {}).update(data)
+            
+            # Match with STS files by context, e.g. m64241e_251015_113449
+            sts_contexts = {f: f.name.split('.', 1)[0] for f in sts_files}
+            for sts_file, data in self._parse_files(self.parse_sts_file, sts_files, executor):
+                run_data.setdefault(sts_contexts[sts_file], {}).update(data)
+        finally:
+            if executor is not None:
+                executor.shutdown()
         
-        # Parse SubreadSet files (CLR runs)
-        for subread_file in subread_files:
-            try:
-                data = self.parse_subreadset(subread_file)
-                data['run_type'] = 'CLR'
-                context = data.get('context', subread_file.stem)
-                
-                if context not in run_data:
-                    run_data[context] = {}
-                run_data[context].update(data)
-                
-            except Exception as e:
-                print(f"Error parsing {subread_file}: {e}")
+        return list(run_data.values())
+
+    def iter_runs(self):
+        """Yield one merged dict per SMRT Cell as soon as all of its files are parsed
         
-        # Match with STS files
-        for sts_file in sts_files:
-            try:
-                data = self.parse_sts_file(sts_file)
-                
-                # Try to match with consensus data by context
-                context = sts_file.stem.split('.')[0]  # e.g., m64241e_251015_113449
-                
-                if context in run_data:
-                    run_data[context].update(data)
-                else:
-                    run_data[context] = data
-                    
-            except Exception as e:
-                print(f"Error parsing {sts_file}: {e}")
+        Files are parsed grouped by the context in their name (e.g.
+        m64241e_251015_113449), readsets before sts, so each run is complete
+        when the next context starts. Runs come out in no particular order.
+        """
+        consensus_files, subread_files, sts_files = self.find_xml_files()
         
-        # Convert to list
-        all_data = list(run_data.values())
+        contexts = {}
+        tasks = []
+        for parse, xml_files in ((self.parse_consensusreadset, consensus_files),
+                                 (self.parse_subreadset, subread_files),
+                                 (self.parse_sts_file, sts_files)):
+            for xml_file in xml_files:
+                contexts[xml_file] = xml_file.name.split('.', 1)[0]
+                tasks.append((parse, xml_file))
+        # Stable sort keeps readsets ahead of the sts file within a context
+        tasks.sort(key=lambda task: contexts[task[1]])
         
-        return pd.DataFrame(all_data)
+        executor = ProcessPoolExecutor(max_workers=self.jobs) if self.jobs > 1 else None
+        try:
+            parsed = self._parse_tasks(tasks, executor)
+            for _, context_files in groupby(parsed, key=lambda item: contexts[item[0]]):
+                run = {}
+                for _, data in context_files:
+                    run.update(data)
+                yield run
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+
+def write_csv_streaming(rows, output, columns=OUTPUT_COLUMNS, window=STREAMING_HEADER_WINDOW):
+    """Write rows to a CSV file as they arrive
+    
+    The header is the known `columns` followed by any other keys seen in the
+    first `window` rows; keys that only show up after that are left out.
+    Returns (rows written, set of dropped columns).
+    """
+    rows = iter(rows)
+    buffered = list(islice(rows, window))
+    if not buffered:
+        return 0, set()
+    
+    columns = list(dict.fromkeys(chain(columns, (key for row in buffered for key in row))))
+    known = set(columns)
+    dropped = set()
+    count = 0
+    with open(output, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=columns, extrasaction='ignore', lineterminator='\n')
+        writer.writeheader()
+        for row in chain(buffered, rows):
+            dropped.update(row.keys() - known)
+            writer.writerow(row)
+            count += 1
+    return count, dropped
+
+
+def column_values(rows, column):
+    """Non-missing values of one column across all rows"""
+    return [row[column] for row in rows if row.get(column) is not None]
+
+
+def mean(values):
+    """Mean of values, NaN when there are none"""
+    return sum(values) / len(values) if values else float('nan')
+
 
 def main():
     parser = argparse.ArgumentParser(
@@ -389,30 +685,90 @@ def main():
         action='store_true',
         help='Also output as Excel file'
     )
+    parser.add_argument(
+        '--streaming',
+        action='store_true',
+        help='Write each run to the CSV as soon as its files are parsed '
+             '(unsorted, no summary; cannot be combined with --excel)'
+    )
+    parser.add_argument(
+        '--cache',
+        default=DEFAULT_CACHE_FILE,
+        help=f'SQLite file caching parsed XML between runs (default: {DEFAULT_CACHE_FILE})'
+    )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Parse every file, without reading or updating the cache'
+    )
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=1,
+        help='Number of worker processes for XML parsing (default: 1)'
+    )
     
     args = parser.parse_args()
+    if args.streaming and args.excel:
+        parser.error('--excel needs the full table and cannot be used with --streaming')
     
     # Parse runs
     print(f"Scanning {args.base_dir}...")
     print("="*60)
-    parser_obj = SequelRunParser(args.base_dir)
-    df = parser_obj.parse_all_runs()
+    cache = None
+    if not args.no_cache:
+        try:
+            cache = ParseCache(args.cache)
+        except sqlite3.Error as e:
+            print(f"Warning: cannot open cache {args.cache} ({e}); parsing without it")
+    parser_obj = SequelRunParser(args.base_dir, jobs=args.jobs, cache=cache)
+    try:
+        write_output(parser_obj, args)
+    finally:
+        if cache is not None:
+            cache.close()
+
+
+def write_output(parser_obj, args):
+    """Parse all runs and write the CSV (and Excel) output plus a summary"""
+    if args.streaming:
+        count, dropped = write_csv_streaming(parser_obj.iter_runs(), args.output)
+        if count == 0:
+            print("\nNo runs found!")
+            return
+        print(f"\n✓ Saved {count} runs to {args.output}")
+        if dropped:
+            print(f"  Columns not seen in the first {STREAMING_HEADER_WINDOW} runs were left out: "
+                  f"{', '.join(sorted(dropped))}")
+        return
     
-    if len(df) == 0:
+    rows = parser_obj.parse_all_runs()
+    
+    if len(rows) == 0:
         print("\nNo runs found!")
         return
     
-    # Sort by date
-    if 'created_at' in df.columns:
-        df['created_at'] = pd.to_datetime(df['created_at'], errors='coerce')
-        df = df.sort_values('created_at', ascending=False)
+    # Sort by date, newest first; runs without a date go last
+    rows.sort(key=created_at_key, reverse=True)
+    
+    # Columns in order of first appearance across all runs
+    columns = list(dict.fromkeys(key for row in rows for key in row))
     
     # Save output
-    df.to_csv(args.output, index=False)
-    print(f"\n✓ Saved {len(df)} runs to {args.output}")
+    with open(args.output, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=columns, lineterminator='\n')
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"\n✓ Saved {len(rows)} runs to {args.output}")
     
     if args.excel:
+        # pandas/openpyxl are only needed for the Excel output
+        import pandas as pd
         excel_output = args.output.replace('.csv', '.xlsx')
+        df = pd.DataFrame(rows, columns=columns)
+        if 'created_at' in df.columns:
+            # Excel cannot store timezones; all timestamps are UTC
+            df['created_at'] = pd.to_datetime(df['created_at'], utc=True).dt.tz_localize(None)
         df.to_excel(excel_output, index=False, engine='openpyxl')
         print(f"✓ Saved Excel output to {excel_output}")
     
@@ -420,32 +776,34 @@ def main():
     print("\n" + "="*60)
     print("SUMMARY")
     print("="*60)
-    print(f"Total runs parsed: {len(df)}")
+    print(f"Total runs parsed: {len(rows)}")
     
-    if 'run_type' in df.columns:
+    if 'run_type' in columns:
         print("\nRun types:")
-        print(df['run_type'].value_counts().to_string())
+        for run_type, count in Counter(column_values(rows, 'run_type')).most_common():
+            print(f"  {run_type:12s} {count}")
     
-    if 'yield_gb' in df.columns:
-        total_yield = df['yield_gb'].sum()
-        avg_yield = df['yield_gb'].mean()
+    if 'yield_gb' in columns:
+        yields = column_values(rows, 'yield_gb')
+        total_yield = sum(yields)
+        avg_yield = mean(yields)
         print(f"\nTotal yield: {total_yield:.1f} Gb")
         print(f"Average yield per run: {avg_yield:.1f} Gb")
     
-    if 'p1_percent' in df.columns:
-        avg_p1 = df['p1_percent'].mean()
+    if 'p1_percent' in columns:
+        avg_p1 = mean(column_values(rows, 'p1_percent'))
         print(f"\nAverage P1 (single loading): {avg_p1:.1f}%")
     
-    if 'productivity_percent' in df.columns:
-        avg_prod = df['productivity_percent'].mean()
+    if 'productivity_percent' in columns:
+        avg_prod = mean(column_values(rows, 'productivity_percent'))
         print(f"Average productivity: {avg_prod:.1f}%")
     
     print("\n" + "="*60)
-    print(f"Columns extracted ({len(df.columns)}):")
+    print(f"Columns extracted ({len(columns)}):")
     print("="*60)
-    for col in sorted(df.columns):
-        non_null = df[col].notna().sum()
-        print(f"  • {col:30s} ({non_null}/{len(df)} populated)")
+    for col in sorted(columns):
+        non_null = len(column_values(rows, col))
+        print(f"  • {col:30s} ({non_null}/{len(rows)} populated)")
 
 if __name__ == '__main__':
     main()